@@ -1,6 +1,12 @@
+import hashlib
+import io
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import streamlit as st
+from streamlit.file_util import get_streamlit_file_path
+from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -10,69 +16,208 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Ensure a temporary directory exists
-TEMP_DIR = "temp_uploaded_files"
-os.makedirs(TEMP_DIR, exist_ok=True)
-
-# Cache data to improve speed
-@st.cache_data(show_spinner=False)
-def read_csv(file):
-    """Read a CSV file."""
+# Key uploads on their identity instead of hashing the file bytes
+UPLOAD_HASH_FUNCS = {UploadedFile: lambda f: (f.name, f.size, f.file_id)}
+MEMORY_CACHE_KWARGS = {"show_spinner": False, "max_entries": 32, "hash_funcs": UPLOAD_HASH_FUNCS}
+
+# Disk-persisted caches must key on content, since upload ids change between sessions
+CONTENT_HASH_FUNCS = {UploadedFile: lambda f: hashlib.blake2b(f.getbuffer(), digest_size=8).hexdigest()}
+PERSIST_CACHE_KWARGS = {"show_spinner": False, "persist": "disk", "max_entries": 32, "hash_funcs": CONTENT_HASH_FUNCS}
+DISK_CACHE_MAX_FILES = 64
+
+PANDAS_MAJOR = int(pd.__version__.split(".")[0])
+
+# Summarization operations shown in the UI, mapped to their pandas reducers
+SUMMARY_OPERATIONS = {
+    "Min": "min",
+    "Max": "max",
+    "Sum": "sum",
+    "Count": "count",
+    "Average": "mean",
+    "Median": "median",
+    "Standard Deviation": "std",
+}
+
+def downcast_numeric(df):
+    """Shrink integer columns to the smallest dtype that holds their values."""
+    # Floats are left alone: a float32 downcast is allowed to round values
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+def schema_hash(df):
+    """Hash a dataframe's column names, ignoring their order."""
+    # Keep the type so an Excel header 2021 and a CSV header "2021" stay different columns
+    names = sorted(f"{type(name).__name__}:{name}" for name in df.columns)
+    return hashlib.blake2b("\0".join(names).encode(), digest_size=8).hexdigest()
+
+def tag_schema(df):
+    """Store the schema hash on the dataframe so later checks don't revisit its columns."""
+    df.attrs["schema_hash"] = schema_hash(df)
+    return df
+
+def _evict_disk_cache():
+    """Delete the least recently written persisted cache entries beyond DISK_CACHE_MAX_FILES."""
+    # Streamlit's disk cache never evicts on its own; max_entries only bounds the in-memory copy
+    cache_dir = get_streamlit_file_path("cache")
+    try:
+        paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".memo")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for path in paths[DISK_CACHE_MAX_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@st.cache_data(**PERSIST_CACHE_KWARGS)
+def _persisted_read_csv(file):
+    """Parse a CSV file into the disk-persisted cache."""
+    _evict_disk_cache()
     try:
-        return pd.read_csv(file, encoding="ISO-8859-1")
+        df = pd.read_csv(file, encoding="ISO-8859-1", engine="pyarrow", dtype_backend="pyarrow")
+        return tag_schema(df)
     except Exception as e:
         st.error(f"Error reading CSV file: {e}")
         return None
 
-@st.cache_data(show_spinner=False)
-def read_excel(file):
-    """Read an Excel file and return sheet names."""
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=3600, hash_funcs=UPLOAD_HASH_FUNCS)
+def _open_xlsx(file):
+    """Open an Excel workbook once and keep it alive across reruns."""
+    return pd.ExcelFile(file, engine="calamine")
+
+@st.cache_data(**PERSIST_CACHE_KWARGS)
+def _persisted_read_excel(file):
+    """List an Excel file's sheets into the disk-persisted cache."""
+    _evict_disk_cache()
     try:
-        excel_file = pd.ExcelFile(file, engine="openpyxl")
-        return excel_file.sheet_names
+        return _open_xlsx(file).sheet_names
     except Exception as e:
         st.error(f"Error reading Excel file: {e}")
         return None
 
-def load_excel_sheet(file, sheet_name):
-    """Load a specific sheet from an Excel file."""
+@st.cache_data(**PERSIST_CACHE_KWARGS)
+def _persisted_load_excel_sheet(file, sheet_name):
+    """Parse an Excel sheet into the disk-persisted cache."""
+    _evict_disk_cache()
     try:
-        return pd.read_excel(file, sheet_name=sheet_name, engine="openpyxl")
+        return tag_schema(_open_xlsx(file).parse(sheet_name))
     except Exception as e:
         st.error(f"Error reading sheet '{sheet_name}': {e}")
         return None
 
-@st.cache_data(show_spinner=False)
+# Cache data to improve speed; reruns hit these without hashing the file bytes
+@st.cache_data(**MEMORY_CACHE_KWARGS)
+def read_csv(file, downcast=False):
+    """Read a CSV file, optionally shrinking its integer columns."""
+    df = _persisted_read_csv(file)
+    return downcast_numeric(df) if downcast and df is not None else df
+
+@st.cache_data(**MEMORY_CACHE_KWARGS)
+def read_excel(file):
+    """Read an Excel file and return sheet names."""
+    return _persisted_read_excel(file)
+
+@st.cache_data(**MEMORY_CACHE_KWARGS)
+def load_excel_sheet(file, sheet_name, downcast=False):
+    """Load a specific sheet from an Excel file, optionally shrinking its integer columns."""
+    df = _persisted_load_excel_sheet(file, sheet_name)
+    return downcast_numeric(df) if downcast and df is not None else df
+
 def validate_columns(dfs):
     """Check if all dataframes have identical columns."""
-    columns_list = [set(df.columns) for df in dfs]
-    return all(cols == columns_list[0] for cols in columns_list)
+    return len({df.attrs.get("schema_hash") or schema_hash(df) for df in dfs}) == 1
+
+# Readers by file extension; each takes the upload and its selected sheet name
+FILE_READERS = {
+    "csv": lambda file, sheet_name: read_csv(file),
+    "xlsx": load_excel_sheet,
+    "xls": load_excel_sheet,
+}
+
+def file_kind(file):
+    """Return the lower-cased extension of an uploaded file."""
+    return file.name.rsplit(".", 1)[-1].lower()
+
+def _read_one(file, kind, sheet_name=None):
+    """Read a single uploaded file into a dataframe through its (cached) reader."""
+    return FILE_READERS[kind](file, sheet_name)
 
-@st.cache_data(show_spinner=False)
 def append_files(files, selected_sheets):
     """Append files while validating column consistency."""
-    dfs = []
-    for file in files:
-        if file.name.endswith(("xlsx", "xls")):
-            sheet_name = selected_sheets.get(file.name)
-            if sheet_name:
-                df = load_excel_sheet(file, sheet_name)
-                if df is not None:
-                    dfs.append(df)
-        else:
-            df = read_csv(file)
-            if df is not None:
-                dfs.append(df)
+    # Tag each file once, dropping unknown extensions and Excel files without a sheet
+    tagged = [(file, file_kind(file)) for file in files]
+    tagged = [(file, kind) for file, kind in tagged if kind == "csv" or (kind in FILE_READERS and selected_sheets.get(file.name))]
+
+    dfs = [_read_one(file, kind, selected_sheets.get(file.name)) for file, kind in tagged]
+    dfs = [df for df in dfs if df is not None]
 
     if dfs and validate_columns(dfs):
-        return pd.concat(dfs, ignore_index=True)
+        # Files are read at full width and downcast once after the concat, so same-schema
+        # files keep matching dtypes. Copy-on-Write (pandas >= 3) makes `copy` a no-op.
+        copy_kwargs = {}
+        if PANDAS_MAJOR < 3:
+            # Input blocks can only be reused when every column has the same dtype in every file
+            ref_dtypes = dfs[0].dtypes.to_dict()
+            copy_kwargs["copy"] = not all(df.dtypes.to_dict() == ref_dtypes for df in dfs[1:])
+        return downcast_numeric(pd.concat(dfs, ignore_index=True, sort=False, **copy_kwargs))
     else:
         st.error("Column mismatch detected. Ensure all files have the same structure.")
         return None
 
-def preview_dataframe(df, n=5):
-    """Preview the first few rows of a dataframe."""
-    return df.head(n)
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: lambda d: (tuple(d.columns), tuple(map(str, d.dtypes)))})
+def column_lists(df):
+    """Return the numeric and all column names of a dataframe, keyed on its schema."""
+    return df.select_dtypes(include="number").columns.tolist(), df.columns.tolist()
+
+def preview_dataframe(df, n=5, max_cols=40):
+    """Preview the first few rows and columns of a dataframe or Arrow table."""
+    if isinstance(df, pa.Table):
+        return df.slice(0, n).select(range(min(max_cols, df.num_columns)))
+    return df.iloc[:n, :max_cols]
+
+def to_arrow(df):
+    """Convert a dataframe to an Arrow table, keeping the dataframe if Arrow can't hold it."""
+    if df is None:
+        return None
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Mixed-type object columns (e.g. IDs plus "N/A") have no Arrow type
+        return df
+
+def combined_frame():
+    """Return the appended data as a dataframe, converting an Arrow table only once."""
+    data = st.session_state.combined_data
+    if not isinstance(data, pa.Table):
+        return data
+    cached = st.session_state.get("combined_frame")
+    if cached is None or cached[0] is not data:
+        st.session_state.combined_frame = (data, data.to_pandas(types_mapper=pd.ArrowDtype))
+    return st.session_state.combined_frame[1]
+
+def _summarize_degenerate(df, grouped, operation, selected_columns, group_by_columns, extra_cols):
+    """Summarize one-row-per-group data without reducing the groups, else return None."""
+    keys = df[group_by_columns]
+
+    # Rows with missing keys are dropped by groupby, so a full count means none were
+    if grouped.ngroups == len(df) and operation != "std":
+        # Each group is a single row, so every reduction is the row's own value
+        values = df[selected_columns]
+        if operation == "sum":
+            values = values.fillna(0)
+        elif operation == "count":
+            values = values.notna().astype("int64")
+        elif operation in ("mean", "median"):
+            # Match groupby, which always returns floats for these
+            values = values.astype({
+                col: pd.ArrowDtype(pa.float64()) if isinstance(values[col].dtype, pd.ArrowDtype) else "float64"
+                for col in selected_columns
+            })
+        return pd.concat([keys, values, df[extra_cols]], axis=1).reset_index(drop=True)
+
+    return None
 
 def summarize_csv_files(df, selected_operation, selected_columns, group_by_columns, include_all_columns=False):
     """Summarize data using the selected operation."""
@@ -81,33 +226,28 @@ def summarize_csv_files(df, selected_operation, selected_columns, group_by_colum
             st.warning("No grouping columns selected.")
             return pd.DataFrame()
 
-        grouped = df.groupby(group_by_columns)
-        results = {}
-
-        for col in selected_columns:
-            if selected_operation == "Min":
-                results[col] = grouped[col].min()
-            elif selected_operation == "Max":
-                results[col] = grouped[col].max()
-            elif selected_operation == "Sum":
-                results[col] = grouped[col].sum()
-            elif selected_operation == "Count":
-                results[col] = grouped[col].count()
-            elif selected_operation == "Average":
-                results[col] = grouped[col].mean()
-            elif selected_operation == "Median":
-                results[col] = grouped[col].median()
-            elif selected_operation == "Standard Deviation":
-                results[col] = grouped[col].std()
-
-        summary_df = pd.concat(results, axis=1).reset_index()
-
-        if include_all_columns:
-            extra_cols = [col for col in df.columns if col not in selected_columns + group_by_columns]
-            for col in extra_cols:
-                # Instead of inserting column-by-column, collect all columns first
-             summary_df = grouped.first().reset_index().copy()
-        return summary_df
+        operation = SUMMARY_OPERATIONS.get(selected_operation)
+        if operation is None:
+            st.error(f"Unknown summarization operation: {selected_operation}")
+            return pd.DataFrame()
+
+        # A group key can't also be a summarized column, or the result gets duplicate names
+        selected_columns = [col for col in selected_columns if col not in group_by_columns]
+        extra_cols = [col for col in df.columns if col not in selected_columns + group_by_columns] if include_all_columns else []
+
+        grouped = df.groupby(group_by_columns, sort=False, observed=True)
+
+        summary_df = _summarize_degenerate(df, grouped, operation, selected_columns, group_by_columns, extra_cols)
+        if summary_df is not None:
+            return summary_df
+
+        summary_df = grouped[selected_columns].agg(operation)
+
+        if extra_cols:
+            # Pull every extra column in one reduction; both results share the group index
+            summary_df = summary_df.join(grouped[extra_cols].first())
+
+        return summary_df.reset_index()
 
     except Exception as e:
         st.error(f"Error during summarization: {e}")
@@ -126,9 +266,9 @@ st.markdown(
 # User chooses an operation
 operation = st.radio("Choose an operation:", ["Append Files", "Summarize Data"])
 
-# Global variable to store appended data
-if "combined_df" not in st.session_state:
-    st.session_state.combined_df = None
+# Global variable to store appended data (an Arrow table, or a dataframe Arrow can't hold)
+if "combined_data" not in st.session_state:
+    st.session_state.combined_data = None
 
 # Append Files Section
 if operation == "Append Files":
@@ -139,7 +279,7 @@ if operation == "Append Files":
     
     if uploaded_files:
         for file in uploaded_files:
-            if file.name.endswith(("xlsx", "xls")):
+            if file_kind(file) in ("xlsx", "xls"):
                 sheet_names = read_excel(file)
                 if sheet_names and len(sheet_names) > 1:
                     selected_sheets[file.name] = st.selectbox(f"Select a sheet for {file.name}:", options=sheet_names)
@@ -147,18 +287,19 @@ if operation == "Append Files":
                     selected_sheets[file.name] = sheet_names[0]
 
     if st.button("Append Files") and uploaded_files:
-        st.session_state.combined_df = append_files(uploaded_files, selected_sheets)
+        st.session_state.combined_data = to_arrow(append_files(uploaded_files, selected_sheets))
 
-        if st.session_state.combined_df is not None:
+        if st.session_state.combined_data is not None:
             st.write("### Preview of Combined Data")
-            st.dataframe(preview_dataframe(st.session_state.combined_df))
+            st.dataframe(preview_dataframe(st.session_state.combined_data))
             
-            output_filename = "combined_data.csv"
-            output_csv_path = os.path.join(TEMP_DIR, output_filename)
-            st.session_state.combined_df.to_csv(output_csv_path, index=False)
-
-            with open(output_csv_path, "rb") as f:
-                st.download_button("Download Combined File", data=f, file_name=output_filename, mime="text/csv")
+            buf = io.BytesIO()
+            if isinstance(st.session_state.combined_data, pa.Table):
+                pa_csv.write_csv(st.session_state.combined_data, buf)
+            else:
+                st.session_state.combined_data.to_csv(buf, index=False, chunksize=100_000)
+            buf.seek(0)
+            st.download_button("Download Combined File", data=buf, file_name="combined_data.csv", mime="text/csv")
 
 # Summarize Data Section
 elif operation == "Summarize Data":
@@ -172,18 +313,18 @@ elif operation == "Summarize Data":
         # Checkbox to use combined file
         use_combined = st.checkbox("Use Appended File for Summarization", value=False)
 
-        if use_combined and st.session_state.combined_df is not None:
-            df = st.session_state.combined_df
+        if use_combined and st.session_state.combined_data is not None:
+            df = combined_frame()
         else:
             file = st.file_uploader("OR Upload a new file (CSV/XLSX/XLS)", type=["csv", "xlsx", "xls"])
             if file:
-                if file.name.endswith(".csv"):
-                    df = read_csv(file)
+                if file_kind(file) == "csv":
+                    df = read_csv(file, downcast=True)
                 else:
                     sheet_names = read_excel(file)
                     if sheet_names:
                         sheet_name = st.selectbox("Select a sheet:", options=sheet_names)
-                        df = load_excel_sheet(file, sheet_name)
+                        df = load_excel_sheet(file, sheet_name, downcast=True)
 
     if df is not None:
         with col2:
@@ -191,12 +332,11 @@ elif operation == "Summarize Data":
             st.dataframe(preview_dataframe(df))
 
         with col1:
-            numeric_columns = df.select_dtypes(include=["number"]).columns.tolist()
-            all_columns = df.columns.tolist()
+            numeric_columns, all_columns = column_lists(df)
 
             group_by_columns = st.multiselect("Select columns to group by:", all_columns)
             selected_columns = st.multiselect("Select numeric columns to summarize:", numeric_columns)
-            selected_operation = st.selectbox("Select summarization operation:", ["Min", "Max", "Sum", "Count", "Average", "Median", "Standard Deviation"])
+            selected_operation = st.selectbox("Select summarization operation:", list(SUMMARY_OPERATIONS))
             include_all_columns = st.checkbox("Include All Columns", value=False)
 
         with col2: